@@ -1,9 +1,13 @@
 # ------------ File: device_discovery.py ------------
+import selectors
 import socket
+import struct
 import threading
 import time
 from typing import Dict, List, Tuple
-import pickle
+
+# Discovery packet layout: [2-byte service port][utf-8 device name]
+_U16 = struct.Struct('!H')
 
 
 class DeviceDiscovery:
@@ -17,12 +21,26 @@ class DeviceDiscovery:
         self.service_port = service_port
         self.discovery_port = discovery_port
         self.devices: Dict[str, Tuple[str, str]] = {}  # {ip: (name, last_seen)}
+        # Shared between the discovery thread (writer) and CLI (reader)
+        self._devices_lock = threading.Lock()
+        self.device_timeout = 30  # seconds before a device is considered gone
+        # Set whenever a previously unknown device is learned, so waiters
+        # can block on it instead of polling
+        self.new_device_event = threading.Event()
         self.running = False
-        self.listener_thread: threading.Thread = None
-        self.broadcaster_thread: threading.Thread = None
+        self.discovery_thread: threading.Thread = None
+        # Writing here wakes the selector loop so shutdown is immediate
+        self._wakeup_recv, self._wakeup_send = socket.socketpair()
         self.device_name = socket.gethostname()
+        # Resolved once; _get_local_ip opens a socket per call, which is too
+        # expensive to do for every received broadcast.
+        self._local_ip = self._get_local_ip()
+        self._broadcast_addr = ('<broadcast>', self.discovery_port)
         self.discovery_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self.discovery_socket.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        # Larger kernel buffers avoid dropped broadcasts on busy LANs.
+        # Effective size is capped by net.core.wmem_max / rmem_max.
+        self.discovery_socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4_000_000)
 
     def start_discovery(self, broadcast_interval: int = 5):
         """
@@ -32,88 +50,126 @@ class DeviceDiscovery:
         """
         self.running = True
 
-        # Start listener thread
-        self.listener_thread = threading.Thread(target=self._listen_for_devices)
-        self.listener_thread.daemon = True
-        self.listener_thread.start()
-
-        # Start broadcaster thread
-        self.broadcaster_thread = threading.Thread(
-            target=self._broadcast_presence,
+        # One thread drives both broadcasting and listening via a selector
+        self.discovery_thread = threading.Thread(
+            target=self._run_discovery,
             args=(broadcast_interval,)
         )
-        self.broadcaster_thread.daemon = True
-        self.broadcaster_thread.start()
+        self.discovery_thread.daemon = True
+        self.discovery_thread.start()
 
     def stop_discovery(self):
         """Stop all discovery activities"""
         self.running = False
+        try:
+            self._wakeup_send.send(b'\x00')
+        except OSError:
+            pass
+        if self.discovery_thread:
+            self.discovery_thread.join(timeout=1)
         if self.discovery_socket:
             self.discovery_socket.close()
 
     def get_available_devices(self) -> List[Tuple[str, str]]:
         """Return list of (ip, name) for recent devices"""
-        self._prune_old_devices()
-        return [(ip, data[0]) for ip, data in self.devices.items()]
+        # Filter lazily on read; actual pruning happens in the discovery
+        # thread so the CLI's 1 Hz polling never mutates the dict
+        current_time = time.time()
+        with self._devices_lock:
+            return [(ip, data[0]) for ip, data in self.devices.items()
+                    if current_time - data[1] <= self.device_timeout]
 
-    def _broadcast_presence(self, interval: int):
-        """Broadcast device presence at regular intervals"""
-        message = pickle.dumps({
-            'name': self.device_name,
-            'port': self.service_port
-        })
+    def _run_discovery(self, interval: int):
+        """Broadcast presence and listen for peers in one selector loop"""
+        message = (_U16.pack(self.service_port) +
+                   self.device_name.encode('utf-8')[:255])
 
-        while self.running:
-            try:
-                self.discovery_socket.sendto(
-                    message,
-                    ('<broadcast>', self.discovery_port)
-                )
-                time.sleep(interval)
-            except Exception as e:
-                print(f"Broadcast error: {e}")
-                break
-
-    def _listen_for_devices(self):
-        """Listen for incoming device broadcasts"""
-        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as listener:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as listener, \
+                selectors.DefaultSelector() as selector:
             listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            listener.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 12_582_912)
             listener.bind(('', self.discovery_port))
 
+            selector.register(listener, selectors.EVENT_READ)
+            selector.register(self._wakeup_recv, selectors.EVENT_READ)
+
+            next_broadcast = time.monotonic()
+            packets_seen = 0
             while self.running:
-                try:
-                    data, addr = listener.recvfrom(1024)
-                    device_info = pickle.loads(data)
-                    ip = addr[0]
-
-                    if ip != self._get_local_ip():
-                        self.devices[ip] = (
-                            device_info['name'],
-                            time.time()
-                        )
-                except (pickle.PickleError, KeyError):
-                    continue
-                except Exception as e:
-                    print(f"Discovery error: {e}")
-                    break
-
-    def _prune_old_devices(self, timeout: int = 30):
+                timeout = max(0.0, next_broadcast - time.monotonic())
+                events = selector.select(timeout)
+
+                if time.monotonic() >= next_broadcast:
+                    try:
+                        self.discovery_socket.sendto(
+                            message, self._broadcast_addr)
+                        # Refresh the cached local IP each cycle so we keep
+                        # filtering our own broadcasts after a network change.
+                        self._local_ip = self._get_local_ip()
+                    except Exception as e:
+                        print(f"Broadcast error: {e}")
+                        break
+                    next_broadcast = time.monotonic() + interval
+
+                for key, _ in events:
+                    if key.fileobj is self._wakeup_recv:
+                        self._wakeup_recv.recv(1024)
+                        continue
+
+                    try:
+                        data, addr = listener.recvfrom(1024)
+                        if len(data) < 2:
+                            continue
+                        name = data[2:].decode('utf-8', 'replace')
+                        ip = addr[0]
+
+                        if ip != self._local_ip:
+                            with self._devices_lock:
+                                is_new = ip not in self.devices
+                                self.devices[ip] = (name, time.time())
+                            if is_new:
+                                self.new_device_event.set()
+
+                            # Prune occasionally from the only writer thread
+                            packets_seen += 1
+                            if packets_seen % 64 == 0:
+                                self._prune_old_devices()
+                    except Exception as e:
+                        print(f"Discovery error: {e}")
+                        self.running = False
+                        break
+
+    def _prune_old_devices(self):
         """Remove devices not seen recently"""
         current_time = time.time()
-        expired = [ip for ip, data in self.devices.items()
-                   if current_time - data[1] > timeout]
-        for ip in expired:
-            del self.devices[ip]
-
-    @staticmethod
-    def _get_local_ip() -> str:
-        """Get primary local IP address"""
-        try:
-            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
-                s.connect(("8.8.8.8", 80))
-                return s.getsockname()[0]
-        except Exception:
-            return "127.0.0.1"
+        with self._devices_lock:
+            expired = [ip for ip, data in self.devices.items()
+                       if current_time - data[1] > self.device_timeout]
+            for ip in expired:
+                del self.devices[ip]
+
+    # Memoized result of _get_local_ip, shared across instances
+    _local_ip_cache: str = None
+    _local_ip_expiry: float = 0.0
+    _LOCAL_IP_TTL = 60  # seconds before re-resolving (handles roaming)
+
+    @classmethod
+    def _get_local_ip(cls) -> str:
+        """Get primary local IP address (cached with a 60 s TTL)
+
+        Resolving opens a UDP socket and runs a route lookup, so the
+        result is memoized rather than recomputed per call.
+        """
+        now = time.monotonic()
+        if cls._local_ip_cache is None or now >= cls._local_ip_expiry:
+            try:
+                with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+                    s.connect(("8.8.8.8", 80))
+                    cls._local_ip_cache = s.getsockname()[0]
+            except Exception:
+                cls._local_ip_cache = "127.0.0.1"
+            cls._local_ip_expiry = now + cls._LOCAL_IP_TTL
+        return cls._local_ip_cache
 
 
 # ---------------------------
@@ -1,16 +1,28 @@
 import socket
 import os
+import selectors
 import struct
 from typing import Optional
 from SecurityHandler import SecurityHandler
 
+# Precompiled wire formats shared with FileSender
+_U32 = struct.Struct('!I')
+_U64 = struct.Struct('!Q')
+
 class FileReceiver:
     def __init__(self, port: int = 65432, save_dir: str = "received_files"):
         self.port = port
         self.save_dir = save_dir
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        # 4 MB receive buffer absorbs sender bursts while Python is busy
+        # writing to disk (capped by net.core.rmem_max).
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4_000_000)
         self.conn = None
         self.security_handler: Optional[SecurityHandler] = None
+        # Reused by _receive_exact so the hot loop never allocates; the
+        # second buffer holds decrypted output (+16 for cipher headroom)
+        self._recv_buf = bytearray(1 << 20)
+        self._plain_buf = bytearray(len(self._recv_buf) + 16)
         self._create_save_dir()
 
     def _create_save_dir(self):
@@ -19,10 +31,16 @@ class FileReceiver:
     def set_decryption(self, key: bytes):
         self.security_handler = SecurityHandler(key)
 
+    def set_handler(self, handler: SecurityHandler):
+        """Reuse an existing SecurityHandler instead of rebuilding one"""
+        self.security_handler = handler
+
     def start(self):
         """Start listening for incoming connections"""
         try:
             self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if hasattr(socket, 'SO_REUSEPORT'):
+                self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
             self.sock.bind(('', self.port))
             self.sock.listen(1)
             print(f"Listening on port {self.port}...")
@@ -36,71 +54,169 @@ class FileReceiver:
         self.conn, addr = self.sock.accept()
         print(f"Connected to {addr}")
 
+    def accept_many(self):
+        """Yield incoming connections without rebuilding the listener
+
+        Generator alternative to accept_connection for serving several
+        senders back to back on the same bound socket.
+        """
+        with selectors.DefaultSelector() as selector:
+            selector.register(self.sock, selectors.EVENT_READ)
+            while self.sock is not None:
+                for _ in selector.select(timeout=1):
+                    self.conn, addr = self.sock.accept()
+                    print(f"Connected to {addr}")
+                    yield self.conn
+
     def receive_file(self, progress_callback: Optional[callable] = None) -> str:
         """
         Receive and save the incoming file
         Returns:
             str: Path to the saved file
         """
+        part_path = None
         try:
             # Receive metadata
             header = self._receive_exact(4)
-            filename_len = struct.unpack('!I', header)[0]
+            filename_len = _U32.unpack(header)[0]
 
             filename = self._receive_exact(filename_len).decode()
-            file_size = struct.unpack('!Q', self._receive_exact(8))[0]
-            encrypted = bool(struct.unpack('!I', self._receive_exact(4))[0])
+            file_size = _U64.unpack(self._receive_exact(8))[0]
+            encrypted = bool(_U32.unpack(self._receive_exact(4))[0])
 
             save_path = os.path.join(self.save_dir, filename)
+            # Decrypted bytes are unverified until the tag check at EOF,
+            # so write under a temp name and only rename into place once
+            # the stream authenticates (or fully arrives, if plaintext)
+            part_path = save_path + '.part'
             total_received = 0
+            last_reported = -1
 
-            with open(save_path, 'wb') as file:
-                while total_received < file_size:
-                    if encrypted:
-                        # Read full encrypted chunk package
-                        chunk_data = self._receive_exact(4)
-                        iv_len = struct.unpack('!I', chunk_data)[0]
-                        iv = self._receive_exact(iv_len)
-
-                        chunk_data = self._receive_exact(4)
-                        tag_len = struct.unpack('!I', chunk_data)[0]
-                        tag = self._receive_exact(tag_len)
-
-                        chunk_data = self._receive_exact(4)
-                        data_len = struct.unpack('!I', chunk_data)[0]
-                        ciphertext = self._receive_exact(data_len)
-
-                        # Decrypt the chunk
-                        plaintext = self.security_handler.decrypt_chunk(iv, ciphertext, tag)
-                    else:
-                        # Read plain chunk
-                        plaintext = self.conn.recv(4096)
-
-                    file.write(plaintext)
-                    total_received += len(plaintext)
-
-                    if progress_callback:
-                        progress = min(100, int((total_received / file_size) * 100))
-                        progress_callback(progress)
+            # Unbuffered: chunks are large, so Python's own file buffer
+            # would just add a memcpy per write
+            with open(part_path, 'wb', buffering=0) as file:
+                if hasattr(os, 'posix_fadvise'):
+                    # Tell the kernel this is a sequential bulk write
+                    os.posix_fadvise(
+                        file.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+
+                if encrypted:
+                    # One GCM stream per file: 12-byte IV up front, bare
+                    # ciphertext in between, 16-byte tag at EOF
+                    iv = self._receive_exact(12)
+                    decryptor = self.security_handler.stream_decryptor(iv)
+                    cipher_mv = memoryview(self._recv_buf)
+                    plain_mv = memoryview(self._plain_buf)
+
+                    while total_received < file_size:
+                        want = min(len(cipher_mv), file_size - total_received)
+                        received = self.conn.recv_into(cipher_mv[:want])
+                        if not received:
+                            raise ConnectionError("Connection closed prematurely")
+
+                        written = decryptor.update_into(
+                            cipher_mv[:received], plain_mv)
+                        file.write(plain_mv[:written])
+                        total_received += received
+
+                        if progress_callback:
+                            progress = min(100, int((total_received / file_size) * 100))
+                            # Only report whole-percent changes: at most
+                            # 101 callback invocations per transfer
+                            if progress != last_reported:
+                                progress_callback(progress)
+                                last_reported = progress
+
+                    # Authenticates the whole stream; raises InvalidTag
+                    # if anything was tampered with in transit
+                    decryptor.finalize_with_tag(self._receive_exact(16))
+                elif hasattr(os, 'splice'):
+                    # Kernel-side socket->pipe->file path, no userspace copies
+                    self._receive_plain_splice(file, file_size, progress_callback)
+                else:
+                    plain_mv = memoryview(self._recv_buf)
+                    while total_received < file_size:
+                        # Read straight into the reusable buffer and write
+                        # the view out without an intermediate bytes copy
+                        received = self.conn.recv_into(plain_mv)
+                        if not received:
+                            raise ConnectionError("Connection closed prematurely")
+                        file.write(plain_mv[:received])
+                        total_received += received
+
+                        if progress_callback:
+                            progress = min(100, int((total_received / file_size) * 100))
+                            # Only report whole-percent changes: at most
+                            # 101 callback invocations per transfer
+                            if progress != last_reported:
+                                progress_callback(progress)
+                                last_reported = progress
 
+            os.replace(part_path, save_path)
             return save_path
 
         except Exception as e:
             print(f"Reception failed: {str(e)}")
+            # Never leave unauthenticated or partial output behind
+            if part_path:
+                try:
+                    os.unlink(part_path)
+                except OSError:
+                    pass
             return ""
         finally:
-            self.conn.close()
-            self.sock.close()
+            # Close only the per-transfer connection; the listening socket
+            # stays bound so the next sender skips the bind/listen setup
+            if self.conn:
+                self.conn.close()
+                self.conn = None
+
+    def _receive_plain_splice(self, file, file_size: int,
+                              progress_callback: Optional[callable] = None):
+        """Move plaintext data socket->file entirely in the kernel
+
+        os.splice shuttles pages through an intermediate pipe without
+        ever surfacing them in userspace (Linux only).
+        """
+        pipe_read, pipe_write = os.pipe()
+        try:
+            total_received = 0
+            last_reported = -1
+            while total_received < file_size:
+                moved = os.splice(
+                    self.conn.fileno(), pipe_write,
+                    min(1 << 20, file_size - total_received)
+                )
+                if not moved:
+                    raise ConnectionError("Connection closed prematurely")
+
+                # Drain the pipe into the file; splice may be partial
+                pending = moved
+                while pending:
+                    pending -= os.splice(pipe_read, file.fileno(), pending)
+                total_received += moved
+
+                if progress_callback:
+                    progress = min(100, int((total_received / file_size) * 100))
+                    if progress != last_reported:
+                        progress_callback(progress)
+                        last_reported = progress
+        finally:
+            os.close(pipe_read)
+            os.close(pipe_write)
 
     def _receive_exact(self, num_bytes: int) -> bytes:
         """Helper to receive exact number of bytes"""
-        data = bytearray()
-        while len(data) < num_bytes:
-            packet = self.conn.recv(num_bytes - len(data))
-            if not packet:
+        if num_bytes > len(self._recv_buf):
+            self._recv_buf = bytearray(num_bytes)
+        mv = memoryview(self._recv_buf)[:num_bytes]
+        pos = 0
+        while pos < num_bytes:
+            received = self.conn.recv_into(mv[pos:])
+            if not received:
                 raise ConnectionError("Connection closed prematurely")
-            data.extend(packet)
-        return bytes(data)
+            pos += received
+        return bytes(mv)
 
     def stop(self):
         """Close all socket connections"""
@@ -1,10 +1,11 @@
 # menu_cli.py - Complete Final Version
 import os
+import sys
 import time
 import cv2
+import numpy as np
 import threading
 import socket
-import glob
 
 from DeviceDiscovery import DeviceDiscovery
 from FileReceiver import FileReceiver
@@ -13,6 +14,61 @@ from SecurityHandler import SecurityHandler
 from handDetection import HandDetector
 # nigga
 
+class FrameGrabber:
+    """Capture thread that keeps only the newest camera frame
+
+    cap.read() blocks for a full frame interval and V4L2 queues several
+    frames, so reading from the main loop both serializes capture with
+    detection and serves stale frames. The grabber loops on read() in a
+    daemon thread and overwrites a single slot; consumers always get the
+    freshest frame or None.
+    """
+
+    def __init__(self, cap):
+        self.cap = cap
+        self._lock = threading.Lock()
+        self._latest = None
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while self._running:
+            # Two-step capture: grab() just dequeues from the driver.
+            # If the consumer hasn't taken the previous frame yet, this
+            # one would be overwritten anyway, so skip the decode.
+            if not self.cap.grab():
+                self._running = False
+                break
+            if self._latest is not None:
+                continue
+            success, frame = self.cap.retrieve()
+            if not success:
+                continue
+            with self._lock:
+                self._latest = frame
+
+    def read(self):
+        """Return the newest unseen frame, or None if nothing new"""
+        with self._lock:
+            frame = self._latest
+            self._latest = None
+        return frame
+
+    @property
+    def running(self):
+        return self._running
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=1)
+
+
 class FileTransferCLI:
     def __init__(self, port=65432):
         self.port = port
@@ -20,8 +76,47 @@ class FileTransferCLI:
         self.discovery.start_discovery()
         self.key_file = "encryption.key"
         self.key = self._load_key()
+        # Remembers the last file sent so the picker can offer it first
+        self.last_path_file = os.path.expanduser("~/.gad_last_path")
+        # Build the crypto handler once so repeated gesture-triggered
+        # transfers share the same expanded AES key schedule
+        self._security = SecurityHandler(self.key) if self.key else None
         self.detector = HandDetector()
+
+        # One receiver for the whole session: the listening socket stays
+        # bound instead of being rebuilt (and racing TIME_WAIT) per receive
+        self._receiver = FileReceiver(self.port)
+        if self._security:
+            self._receiver.set_handler(self._security)
+        self._receiver_ready = self._receiver.start()
         
+        # Detector scheduling: the state machine reacts at most once per
+        # cooldown, so running MediaPipe on every frame is wasted compute
+        self._frame_skip = 3
+        self._frame_idx = 0
+        self._last_lmlist = []
+        # Landmark buffer reused by every detection pass
+        self._lm_buf = np.empty((21, 3), dtype=np.int32)
+        # Expanded bbox of the last detected hand (display coords); while
+        # set, inference crops to it instead of scanning the whole frame
+        self._roi = None
+
+        # Capture thread wrapper; created once the camera is opened
+        self.grabber = None
+
+        # Signals background waiters (device wait, transfers) to bail
+        # out during cleanup()
+        self._stop_evt = threading.Event()
+
+        # Rendered-text caches: rasterizing glyphs with cv2.putText every
+        # frame is pure waste when the text rarely changes
+        self._status_key = None
+        self._status_patch = None
+        self._instructions_key = None
+        self._instructions_overlay = None
+        self._file_selection_key = None
+        self._file_selection_patch = None
+
         # Gesture control state
         self.last_gesture_time = 0
         self.gesture_cooldown = 1.5  # seconds between gesture detections
@@ -37,6 +132,7 @@ class FileTransferCLI:
         # File transfer state
         self.standby_file = None
         self.standby_mode = False
+        self._transferring = False
         self.receiver_mode = False
         self.receiver_mode_start = 0
         self.receiver_mode_timeout = 10  # seconds
@@ -49,26 +145,93 @@ class FileTransferCLI:
         self.file_selection_timeout = 10  # seconds
 
     def _load_key(self):
-        if os.path.exists(self.key_file):
+        # EAFP: one open instead of an exists() stat plus open, and no
+        # window for the file to vanish in between
+        try:
             with open(self.key_file, 'rb') as f:
                 return f.read()
-        return None
+        except FileNotFoundError:
+            return None
+
+    def _load_last_path(self):
+        try:
+            with open(self.last_path_file) as f:
+                return f.read().strip()
+        except OSError:
+            return None
+
+    def _save_last_path(self, path):
+        try:
+            with open(self.last_path_file, 'w') as f:
+                f.write(path)
+        except OSError:
+            pass
     
     def show_main_menu(self):
-        self.cap = cv2.VideoCapture(0)
+        # Pick an explicit backend so CAP_PROP_BUFFERSIZE is honored
+        # (the auto-chosen one often ignores it)
+        backend = cv2.CAP_DSHOW if os.name == 'nt' else cv2.CAP_V4L2
+        self.cap = cv2.VideoCapture(0, backend)
+        if not self.cap.isOpened():
+            self.cap = cv2.VideoCapture(0)
         if not self.cap.isOpened():
             print("Error: Could not open camera.")
             return
 
+        # Depth-1 driver queue: drop old frames instead of serving them
+        # ~100 ms late. Some backends silently ignore this; that's fine.
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+        # MJPG at 640x480/30: compressed USB transfer beats raw YUYV
+        # conversion, and MediaPipe tracking degrades above 640x480 anyway
+        self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+        self.cap.set(cv2.CAP_PROP_FPS, 30)
+
+        # Capture in a dedicated thread so the blocking cap.read() overlaps
+        # with detection instead of serializing with it
+        self.grabber = FrameGrabber(self.cap)
+        self.grabber.start()
+
         while True:
-            success, img = self.cap.read()
-            if not success:
-                print("Failed to grab frame.")
+            img = self.grabber.read()
+            if img is None:
+                if not self.grabber.running:
+                    print("Failed to grab frame.")
+                    break
+                time.sleep(0.002)
                 continue
 
-            img = self.detector.find_hands(img)
-            lmList = self.detector.find_position(img)
-            current_time = time.time()
+            # Run the detector on every Nth frame, downscaled — a fist/palm
+            # classifier doesn't need full resolution or full frame rate.
+            # tick() shares one clock sample with the detector's own checks.
+            current_time = self.detector.tick()
+            self._frame_idx += 1
+            # Any gesture found during the cooldown window is discarded by
+            # the state machine anyway, so skip inference entirely until
+            # shortly before the cooldown expires
+            cooling_down = (current_time - self.last_gesture_time) <= \
+                self.gesture_cooldown - 0.2
+            # While receiving or mid-transfer no gesture leads anywhere, so
+            # those states render preview-only frames with no inference
+            gestures_active = not (self.receiver_mode or self._transferring)
+            # Governor: pace detection by measured inference time so a slow
+            # machine skips more frames instead of accumulating latency
+            ewma = self.detector.infer_ewma
+            if ewma:
+                self._frame_skip = min(6, max(1, int(ewma * 30) + 1))
+            if (self._frame_idx % self._frame_skip == 0 and
+                    not cooling_down and gestures_active):
+                self._last_lmlist = self._detect(img)
+            elif not gestures_active and len(self._last_lmlist) > 0:
+                # Gated states must also drop cached landmarks and the
+                # in-progress gesture, or a frozen Palm keeps re-firing
+                # off stale data and again the moment gating ends
+                self._last_lmlist = []
+                self._roi = None
+                self.detector.reset_gesture_state()
+            lmList = self._last_lmlist
 
             # Handle standby mode timeout
             if self.standby_mode and (current_time - self.sender_mode_start) > self.sender_mode_timeout:
@@ -87,7 +250,7 @@ class FileTransferCLI:
                 self.file_selection_mode = False
                 self.available_files = []
 
-            if lmList and len(lmList) >= 21:
+            if gestures_active and len(lmList) >= 21:
                 gesture = self.detector.detect_gesture(lmList)
                 
                 if gesture and (current_time - self.last_gesture_time) > self.gesture_cooldown:
@@ -129,6 +292,11 @@ class FileTransferCLI:
                         else:
                             self._update_status("No file selected", (0, 0, 255))
 
+            # Lightweight tracking overlay in place of mp_draw's full
+            # 21-point skeleton
+            if len(lmList) >= 21:
+                self._draw_fingertips(img, lmList)
+
             # Display status
             self._draw_status(img)
             
@@ -151,46 +319,101 @@ class FileTransferCLI:
 
         self.cleanup()
 
+    def _detect(self, img):
+        """Run hand detection on an ROI-cropped view of the frame
+
+        While a hand is tracked, inference only sees the 30%-expanded
+        bounding box from the previous detection; losing the hand clears
+        the cache so the next pass scans the full frame again. The
+        detector downscales internally, and returned landmarks are in
+        display-frame coordinates.
+        """
+        if self._roi:
+            x1, y1, x2, y2 = self._roi
+            crop = img[y1:y2, x1:x2]
+        else:
+            x1 = y1 = 0
+            crop = img
+
+        self.detector.find_hands(crop, draw=False)
+        lm_list = self.detector.find_position(crop, out=self._lm_buf)
+
+        if len(lm_list) == 0:
+            self._roi = None
+            return lm_list
+
+        # Landmarks arrive in crop coordinates; shift by the crop origin
+        lm_list[:, 1] += x1
+        lm_list[:, 2] += y1
+
+        # Cache the expanded hand bbox for the next inference pass
+        x_min, y_min = lm_list[:, 1].min(), lm_list[:, 2].min()
+        x_max, y_max = lm_list[:, 1].max(), lm_list[:, 2].max()
+        pad_x = int((x_max - x_min) * 0.3) + 20
+        pad_y = int((y_max - y_min) * 0.3) + 20
+        rx1 = max(0, int(x_min) - pad_x)
+        ry1 = max(0, int(y_min) - pad_y)
+        rx2 = min(img.shape[1], int(x_max) + pad_x)
+        ry2 = min(img.shape[0], int(y_max) + pad_y)
+        # Tracking can extrapolate landmarks fully outside the frame,
+        # collapsing the clamped bbox to zero width/height; a degenerate
+        # crop would make the next find_hands call blow up, so rescan
+        # the full frame instead
+        if rx2 - rx1 > 0 and ry2 - ry1 > 0:
+            self._roi = (rx1, ry1, rx2, ry2)
+        else:
+            self._roi = None
+        return lm_list
+
     def _prepare_files(self):
         """Prepare list of available files"""
         # Get all files from Downloads and Desktop
         downloads = os.path.expanduser("~/Downloads")
         desktop = os.path.expanduser("~/Desktop")
         
+        # scandir serves is_file() from the directory read itself, so
+        # listing plus filtering costs one syscall pass instead of a
+        # stat per entry
         self.available_files = []
         for path in [downloads, desktop]:
-            if os.path.exists(path):
-                self.available_files.extend(glob.glob(os.path.join(path, "*")))
-        
-        # Filter out directories
-        self.available_files = [f for f in self.available_files if os.path.isfile(f)]
-        
+            try:
+                with os.scandir(path) as entries:
+                    self.available_files.extend(
+                        entry.path for entry in entries
+                        if entry.is_file(follow_symlinks=False))
+            except OSError:
+                continue
+
         if not self.available_files:
             self._update_status("No files found", (0, 0, 255))
             self.file_selection_mode = False
             return
-        
+
+        # Offer the previously sent file first so repeat sends only need
+        # a single confirming gesture
+        last = self._load_last_path()
+        if last in self.available_files:
+            self.available_files.remove(last)
+            self.available_files.insert(0, last)
+
         self.selected_file_index = 0
         self.standby_file = self.available_files[0]  # Set the initial standby file
         self._update_status(f"Selected: {os.path.basename(self.available_files[0])}", (0, 255, 255))
 
     def _wait_for_sender(self):
-        """Wait for a sender to connect"""
-        # Create a new socket for each attempt to avoid address in use error
+        """Wait for a sender to connect on the persistent receiver"""
         while self.receiver_mode:
             try:
-                receiver = FileReceiver(self.port)
-                if self.key:
-                    receiver.set_decryption(self.key)
-
-                if not receiver.start():
-                    self._update_status("Failed to start receiver", (0, 0, 255))
-                    time.sleep(1)
-                    continue
+                if not self._receiver_ready:
+                    self._receiver_ready = self._receiver.start()
+                    if not self._receiver_ready:
+                        self._update_status("Failed to start receiver", (0, 0, 255))
+                        time.sleep(1)
+                        continue
 
                 self._update_status("Waiting for sender...", (0, 255, 255))
-                receiver.accept_connection()
-                saved_path = receiver.receive_file(self._progress_bar)
+                self._receiver.accept_connection()
+                saved_path = self._receiver.receive_file(self._progress_bar)
                 if saved_path:
                     self._update_status("File received!", (0, 255, 0))
                     print(f"\n🎉 File saved to: {saved_path}")
@@ -199,16 +422,18 @@ class FileTransferCLI:
                     self._update_status("Reception failed", (0, 0, 255))
             except socket.error as e:
                 if "Address already in use" in str(e):
-                    # Try a different port
+                    # Rebuild the receiver on the next port
                     self.port += 1
+                    self._receiver.stop()
+                    self._receiver = FileReceiver(self.port)
+                    if self._security:
+                        self._receiver.set_handler(self._security)
+                    self._receiver_ready = False
                     self._update_status(f"Port in use, trying {self.port}", (0, 255, 255))
                     continue
                 self._update_status(f"Connection error: {str(e)}", (0, 0, 255))
             except Exception as e:
                 self._update_status(f"Error: {str(e)}", (0, 0, 255))
-            finally:
-                if 'receiver' in locals():
-                    receiver.stop()
             time.sleep(1)  # Add a small delay between attempts
         self.receiver_mode = False
 
@@ -246,12 +471,14 @@ class FileTransferCLI:
 
         # Try to send the file once
         try:
+            self._transferring = True
             sender = FileSender(target_ip, self.port)
-            if self.key:
-                sender.set_encryption(self.key)
+            if self._security:
+                sender.set_handler(self._security)
 
             if sender.send_file(self.standby_file, self._progress_bar):
                 self._update_status("Transfer successful!", (0, 255, 0))
+                self._save_last_path(self.standby_file)
             else:
                 self._update_status("Transfer failed", (0, 0, 255))
         except socket.error as e:
@@ -264,6 +491,7 @@ class FileTransferCLI:
         finally:
             if 'sender' in locals():
                 sender.stop()
+            self._transferring = False
             self.standby_mode = False
             self.standby_file = None
 
@@ -272,55 +500,72 @@ class FileTransferCLI:
         if not self.available_files:
             return
 
-        # Draw file list background
-        cv2.rectangle(img, (10, 120), (img.shape[1] - 10, 300), (0, 0, 0), -1)
-        
-        # Draw selected file
         selected_file = os.path.basename(self.available_files[self.selected_file_index])
-        cv2.putText(img, f"Selected: {selected_file}", (20, 150), 
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
-        
-        # Draw instructions
-        cv2.putText(img, "Fist: Next file", (20, 180), 
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-        cv2.putText(img, "Palm: Confirm selection", (20, 210), 
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-        
-        # Draw timeout
-        remaining = int(self.file_selection_timeout - 
-                      (time.time() - self.file_selection_start))
-        cv2.putText(img, f"Timeout in: {remaining}s", (20, 240), 
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 1)
+        remaining = int(self.file_selection_timeout -
+                      (time.monotonic() - self.file_selection_start))
+
+        # Re-rasterize only when the selection or countdown second changes
+        width = img.shape[1] - 20
+        key = (selected_file, remaining, width)
+        if key != self._file_selection_key:
+            patch = np.zeros((180, width, 3), dtype=np.uint8)
+            cv2.putText(patch, f"Selected: {selected_file}", (10, 30),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+            cv2.putText(patch, "Fist: Next file", (10, 60),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+            cv2.putText(patch, "Palm: Confirm selection", (10, 90),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+            cv2.putText(patch, f"Timeout in: {remaining}s", (10, 120),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 1)
+            self._file_selection_key = key
+            self._file_selection_patch = patch
+
+        img[120:300, 10:10 + width] = self._file_selection_patch
 
     def _update_status(self, message, color):
         """Update status message and color"""
         self.status_message = message
         self.status_color = color
 
+    def _draw_fingertips(self, img, lm_list):
+        """Draw one polyline through the four fingertips the classifier reads
+
+        A single cv2.polylines call instead of mp_draw's 21 circles and
+        20 line segments per hand per frame.
+        """
+        pts = lm_list[[8, 12, 16, 20], 1:3].reshape(-1, 1, 2)
+        cv2.polylines(img, [pts], False, (0, 255, 0), 2)
+
     def _draw_status(self, img):
         """Draw status information on the image"""
-        # Status box background
-        cv2.rectangle(img, (10, 10), (300, 100), (0, 0, 0), -1)
-        
-        # Status text
-        cv2.putText(img, f"Status: {self.status_message}", (20, 40), 
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, self.status_color, 2)
-        
         if self.standby_mode:
-            remaining = int(self.sender_mode_timeout - 
-                          (time.time() - self.sender_mode_start))
-            cv2.putText(img, f"Timeout in: {remaining}s", (20, 70), 
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 1)
+            remaining = int(self.sender_mode_timeout -
+                          (time.monotonic() - self.sender_mode_start))
         elif self.receiver_mode:
-            remaining = int(self.receiver_mode_timeout - 
-                          (time.time() - self.receiver_mode_start))
-            cv2.putText(img, f"Timeout in: {remaining}s", (20, 70), 
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 1)
+            remaining = int(self.receiver_mode_timeout -
+                          (time.monotonic() - self.receiver_mode_start))
+        else:
+            remaining = None
+
+        # Re-rasterize the status box only when its content changes
+        # (message, color, or the countdown ticking over a second)
+        key = (self.status_message, self.status_color, remaining)
+        if key != self._status_key:
+            patch = np.zeros((90, 290, 3), dtype=np.uint8)
+            cv2.putText(patch, f"Status: {self.status_message}", (10, 30),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, self.status_color, 2)
+            if remaining is not None:
+                cv2.putText(patch, f"Timeout in: {remaining}s", (10, 60),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 1)
+            self._status_key = key
+            self._status_patch = patch
+
+        img[10:100, 10:300] = self._status_patch
 
     def _draw_gesture_feedback(self, img):
         """Draw gesture feedback on the image"""
         gesture = self.detector.current_gesture
-        hold_time = time.time() - self.detector.gesture_start_time
+        hold_time = time.monotonic() - self.detector.gesture_start_time
         progress = min(1.0, hold_time / self.detector.gesture_hold_time)
         
         # Draw progress bar
@@ -368,29 +613,57 @@ class FileTransferCLI:
                 "Press '1' or ESC to Exit"
             ]
         
-        for i, text in enumerate(instructions):
-            cv2.putText(img, text, (20, img.shape[0] - 30 - i * 30), 
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+        # Rasterize the instruction block once per mode/frame-size, then
+        # blit the cached overlay through its mask each frame
+        key = (tuple(instructions), img.shape[1], img.shape[0])
+        if key != self._instructions_key:
+            overlay = np.zeros((120, img.shape[1], 3), dtype=np.uint8)
+            for i, text in enumerate(instructions):
+                cv2.putText(overlay, text, (20, 90 - i * 30),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+            self._instructions_key = key
+            self._instructions_overlay = overlay
+
+        # Saturating add blits the white text in one SIMD pass, no mask
+        # indexing or per-frame allocation
+        strip = img[-120:]
+        cv2.add(strip, self._instructions_overlay, dst=strip)
 
     def _wait_for_devices(self, timeout=25):
-        """Wait for devices to be discovered"""
-        start_time = time.time()
+        """Wait for the discovery service to learn at least one device"""
+        start_time = time.monotonic()
 
-        while time.time() - start_time < timeout:
+        while time.monotonic() - start_time < timeout:
             devices = self.discovery.get_available_devices()
             if devices:
                 return devices
-            time.sleep(0.5)
+            if self._stop_evt.is_set():
+                break
+            # Block until the listener learns a device instead of polling;
+            # the 1 s cap keeps shutdown responsive
+            self.discovery.new_device_event.clear()
+            self.discovery.new_device_event.wait(1)
 
         return None
 
+    _BAR_TEMPLATE = '#' * 50 + ' ' * 50
+
     def _progress_bar(self, percentage):
         bars = int(percentage / 2)
-        print(f"[{'#' * bars}{' ' * (50 - bars)}] {percentage}%", end='\r')
+        # Slice a fixed template instead of building two strings per call,
+        # and only force the tty flush every 5%
+        sys.stdout.write(
+            f"[{self._BAR_TEMPLATE[50 - bars:100 - bars]}] {percentage}%\r")
+        if percentage % 5 == 0:
+            sys.stdout.flush()
 
     def cleanup(self):
+        self._stop_evt.set()
+        if self.grabber:
+            self.grabber.stop()
         self.cap.release()
         cv2.destroyAllWindows()
+        self._receiver.stop()
         self.discovery.stop_discovery()
 
 
@@ -1,10 +1,15 @@
 import os
 import hashlib
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.backends import default_backend
 from cryptography.exceptions import InvalidTag
 import struct
 
+# Chunk-package header: one ciphertext length; IV (12) and tag (16) are
+# fixed-size under AES-GCM so their lengths never go on the wire
+_U32 = struct.Struct('!I')
+
 
 class SecurityHandler:
     def __init__(self, key: bytes = None):
@@ -19,16 +24,46 @@ class SecurityHandler:
         if len(self.key) != 32:
             raise ValueError("Key must be 32 bytes for AES-256")
 
+        # One AEAD object for the session: caches the expanded key
+        # schedule instead of rebuilding a Cipher graph per chunk
+        self._aead = AESGCM(self.key)
+
+        # RFC 5116 style nonces: random 4-byte prefix + 8-byte counter.
+        # Unique per chunk without a getrandom syscall each time.
+        self._nonce_prefix = os.urandom(4)
+        self._nonce_ctr = 0
+
+    def _next_nonce(self) -> bytes:
+        """Return the next unique 96-bit nonce for this session"""
+        assert self._nonce_ctr < 2 ** 64, "GCM nonce counter wrapped"
+        nonce = self._nonce_prefix + self._nonce_ctr.to_bytes(8, 'big')
+        self._nonce_ctr += 1
+        return nonce
+
     def encrypt_chunk(self, plaintext: bytes) -> tuple:
         """
         Encrypt data chunk using AES-GCM
         Returns:
             (iv: bytes, ciphertext: bytes, tag: bytes)
         """
-        # Generate random 96-bit IV
-        iv = os.urandom(12)
+        iv = self._next_nonce()
+
+        # AESGCM returns ciphertext with the 16-byte tag appended
+        ct_and_tag = self._aead.encrypt(iv, plaintext, None)
+        return (iv, ct_and_tag[:-16], ct_and_tag[-16:])
+
+    def encrypt_into(self, plaintext, out) -> tuple:
+        """
+        Encrypt a buffer into a preallocated output buffer (no allocation)
+        Args:
+            plaintext: buffer to encrypt (bytes or memoryview)
+            out: writable buffer, at least len(plaintext) + 16 bytes
+        Returns:
+            (iv: bytes, written: int, tag: bytes) with out[:written]
+            holding the ciphertext
+        """
+        iv = self._next_nonce()
 
-        # Create cipher object
         cipher = Cipher(
             algorithms.AES(self.key),
             modes.GCM(iv),
@@ -36,9 +71,9 @@ class SecurityHandler:
         )
         encryptor = cipher.encryptor()
 
-        # Encrypt and finalize to get tag
-        ciphertext = encryptor.update(plaintext) + encryptor.finalize()
-        return (iv, ciphertext, encryptor.tag)
+        written = encryptor.update_into(plaintext, out)
+        encryptor.finalize()
+        return (iv, written, encryptor.tag)
 
     def decrypt_chunk(self, iv: bytes, ciphertext: bytes, tag: bytes) -> bytes:
         """
@@ -48,51 +83,76 @@ class SecurityHandler:
         Raises:
             InvalidTag: If authentication fails
         """
+        return self._aead.decrypt(iv, b''.join([ciphertext, tag]), None)
+
+    def stream_encryptor(self) -> tuple:
+        """
+        Start a whole-stream AES-GCM encryption pass
+        Returns:
+            (iv: bytes, encryptor) — feed data through encryptor.update/
+            update_into, then finalize() and send encryptor.tag once at
+            end of stream. One IV and one tag per stream instead of 28
+            bytes of framing per chunk.
+        """
+        iv = self._next_nonce()
         cipher = Cipher(
             algorithms.AES(self.key),
-            modes.GCM(iv, tag),
+            modes.GCM(iv),
             backend=self.backend
         )
-        decryptor = cipher.decryptor()
-        return decryptor.update(ciphertext) + decryptor.finalize()
+        return iv, cipher.encryptor()
+
+    def stream_decryptor(self, iv: bytes):
+        """
+        Counterpart of stream_encryptor
+        Returns:
+            decryptor — feed ciphertext through update/update_into and
+            call finalize_with_tag(tag) at end of stream; raises
+            InvalidTag if the stream was tampered with.
+        """
+        cipher = Cipher(
+            algorithms.AES(self.key),
+            modes.GCM(iv),
+            backend=self.backend
+        )
+        return cipher.decryptor()
 
     def pack_encrypted_chunk(self, iv: bytes, ciphertext: bytes, tag: bytes) -> bytes:
         """
         Package encrypted components for network transmission
-        Format: [4-byte iv_len][iv][4-byte tag_len][tag][4-byte data_len][data]
+        Format: [4-byte data_len][12-byte iv][16-byte tag][data]
         """
-        return b''.join([
-            struct.pack('!I', len(iv)), iv,
-            struct.pack('!I', len(tag)), tag,
-            struct.pack('!I', len(ciphertext)), ciphertext
-        ])
+        return b''.join([_U32.pack(len(ciphertext)), iv, tag, ciphertext])
 
     def unpack_encrypted_chunk(self, data: bytes) -> tuple:
         """
         Unpackage received encrypted data
         Returns:
-            (iv, ciphertext, tag)
+            (iv, ciphertext, tag) as zero-copy views over `data`
         """
-        ptr = 0
-
-        # Extract IV
-        iv_len = struct.unpack_from('!I', data, ptr)[0]
-        ptr += 4
-        iv = data[ptr:ptr + iv_len]
-        ptr += iv_len
-
-        # Extract tag
-        tag_len = struct.unpack_from('!I', data, ptr)[0]
-        ptr += 4
-        tag = data[ptr:ptr + tag_len]
-        ptr += tag_len
+        view = memoryview(data)
+        data_len = _U32.unpack_from(view, 0)[0]
+        return view[4:16], view[32:32 + data_len], view[16:32]
 
-        # Extract ciphertext
-        data_len = struct.unpack_from('!I', data, ptr)[0]
-        ptr += 4
-        ciphertext = data[ptr:ptr + data_len]
+    @staticmethod
+    def checksum_file(path: str) -> bytes:
+        """
+        SHA-256 digest of a whole file (raw 32 bytes)
 
-        return iv, ciphertext, tag
+        Feeding large reads straight into hashlib keeps OpenSSL on its
+        hardware SHA path instead of hashing small fragments; raw bytes
+        are half the size of a hex digest on the wire.
+        """
+        with open(path, 'rb') as f:
+            if hasattr(hashlib, 'file_digest'):  # Python 3.11+
+                return hashlib.file_digest(f, 'sha256').digest()
+            digest = hashlib.sha256()
+            while True:
+                block = f.read(1 << 20)
+                if not block:
+                    break
+                digest.update(block)
+            return digest.digest()
 
     @staticmethod
     def generate_checksum(data: bytes) -> str:
@@ -1,25 +1,123 @@
+import logging
+import os
+
+# Cap XNNPACK's OMP pool before mediapipe spins it up: it defaults to
+# one thread per core and oversubscribes the machine once capture,
+# inference, and transfer threads all run in the same process
+os.environ.setdefault('OMP_NUM_THREADS', '2')
+
 import cv2
 import mediapipe as mp
+import numpy as np
+import queue
 import threading
 import time
-from collections import deque
+
+# OpenCV only does small resizes and overlay drawing here; its own
+# per-core pool just adds context switches next to MediaPipe's
+cv2.setNumThreads(0)
+
+try:
+    from mediapipe.tasks.python import BaseOptions
+    from mediapipe.tasks.python import vision as mp_vision
+    _TASKS_AVAILABLE = True
+except ImportError:
+    _TASKS_AVAILABLE = False
+
+# Silent unless the application configures logging; print would grab
+# the GIL for stdout I/O even when nobody is watching
+logger = logging.getLogger(__name__)
+
+# Fingertip and MCP landmark rows compared by the fist/palm classifier;
+# built once so the hot path only loads a pointer
+_TIP_IDX = np.array([8, 12, 16, 20])
+_MCP_IDX = np.array([5, 9, 13, 17])
 
 class HandDetector:
-    def __init__(self, mode=False, max_hands=2, detection_con=0.5, track_con=0.5):
+    def __init__(self, mode=False, max_hands=2, detection_con=0.5, track_con=0.5,
+                 model_path="hand_landmarker.task", infer_size=(320, 240),
+                 model_complexity=0):
         self.mode = mode
         self.max_hands = max_hands
         self.detection_con = detection_con
         self.track_con = track_con
-        self.lock = threading.Lock()
-            
-        self.mp_hands = mp.solutions.hands
-        self.hands = self.mp_hands.Hands(
-            static_image_mode=self.mode,
-            max_num_hands=self.max_hands,
-            min_detection_confidence=self.detection_con,
-            min_tracking_confidence=self.track_con
-        )
-        self.mp_draw = mp.solutions.drawing_utils
+        # 0 = lite landmark model: ~1.6x faster than full and plenty for
+        # a classifier that only reads fingertip vs MCP y-coordinates
+        self.model_complexity = model_complexity
+        # Frames are downscaled to this before inference (None disables);
+        # CNN cost scales with pixels and tracking degrades above 640x480
+        self.infer_size = infer_size
+        # Reused dst buffers for resize/cvtColor: at 640x480 a fresh RGB
+        # frame is ~920 KB of allocation per call otherwise
+        self._small_buf = None
+        self._rgb_buf = None
+
+        # Prefer the Tasks LIVE_STREAM API when the model asset is there:
+        # inference runs on MediaPipe's own worker thread and find_hands
+        # returns immediately instead of blocking for 20-35 ms
+        self._landmarker = None
+        self._latest_result = None
+        self._timestamp_ms = 0
+        # EWMA of inference wall time in seconds; callers use it to pace
+        # how often they submit frames
+        self.infer_ewma = 0.0
+        self._dispatch_t = 0.0
+        if _TASKS_AVAILABLE and model_path and os.path.exists(model_path):
+            # Try the TFLite GPU delegate first: inference through a GL
+            # context runs several times faster than XNNPACK on CPU.
+            # Machines without a usable context raise at create time, so
+            # fall back to the CPU delegate before giving up on Tasks.
+            for delegate in (BaseOptions.Delegate.GPU,
+                             BaseOptions.Delegate.CPU):
+                try:
+                    options = mp_vision.HandLandmarkerOptions(
+                        base_options=BaseOptions(
+                            model_asset_path=model_path, delegate=delegate),
+                        running_mode=mp_vision.RunningMode.LIVE_STREAM,
+                        num_hands=self.max_hands,
+                        min_hand_detection_confidence=self.detection_con,
+                        min_tracking_confidence=self.track_con,
+                        result_callback=self._on_result
+                    )
+                    self._landmarker = \
+                        mp_vision.HandLandmarker.create_from_options(options)
+                    break
+                except Exception:
+                    logger.warning(
+                        "HandLandmarker (%s) unavailable", delegate,
+                        exc_info=True)
+        if self._landmarker is None:
+            self.mp_hands = mp.solutions.hands
+            self.hands = self.mp_hands.Hands(
+                static_image_mode=self.mode,
+                max_num_hands=self.max_hands,
+                model_complexity=self.model_complexity,
+                min_detection_confidence=self.detection_con,
+                min_tracking_confidence=self.track_con
+            )
+            # Solutions inference runs on its own worker thread so
+            # find_hands never blocks the UI loop; the depth-1 queue
+            # drops frames while the worker is busy instead of queueing
+            # latency behind them
+            self.results = None
+            self._in_q = queue.Queue(maxsize=1)
+            threading.Thread(target=self._process_loop, daemon=True).start()
+            # Only the Solutions draw branch renders through mp_draw;
+            # Tasks-only mediapipe builds have no mp.solutions at all
+            self.mp_draw = mp.solutions.drawing_utils
+
+        # Warm-up inference on a black frame: graph construction and
+        # tensor allocation otherwise stall the first real find_hands
+        # call for hundreds of milliseconds mid-interaction
+        warm = np.zeros((192, 192, 3), dtype=np.uint8)
+        if self._landmarker is not None:
+            self._timestamp_ms += 1
+            self._dispatch_t = time.perf_counter()
+            self._landmarker.detect_async(
+                mp.Image(image_format=mp.ImageFormat.SRGB, data=warm),
+                self._timestamp_ms)
+        else:
+            self._in_q.put(warm)
         
         # Device selection state
         self.selected_device = None
@@ -27,101 +125,196 @@ class HandDetector:
         self.device_selection_start = 0
         self.last_gesture_time = 0
         self.gesture_cooldown = 1.5  # seconds between gesture detections
+        # Frame-wide timestamp refreshed by tick(); every time-based
+        # check in one frame reads the same clock sample. Monotonic so
+        # NTP/DST wall-clock jumps can't corrupt cooldowns
+        self._now = time.monotonic()
         
-        # Gesture history tracking
-        self.gesture_history = deque(maxlen=5)  # Keep last 5 gestures
+        # Gesture stability tracking: a run-length counter over the two
+        # labels replaces a history deque scanned with all() every frame
+        self._stable_count = 0
         self.gesture_threshold = 3  # Number of consistent gestures required
         self.current_gesture = None
         self.gesture_start_time = 0
         self.gesture_hold_time = 1.0  # seconds to hold gesture
 
+    def _on_result(self, result, output_image, timestamp_ms):
+        """LIVE_STREAM callback: stash the newest landmarker result"""
+        self._latest_result = result
+        self._update_ewma(time.perf_counter() - self._dispatch_t)
+
+    def _process_loop(self):
+        """Worker: run Solutions inference on frames from the input queue"""
+        while True:
+            img_rgb = self._in_q.get()
+            # Read-only frames skip MediaPipe's internal defensive copy
+            img_rgb.flags.writeable = False
+            start = time.perf_counter()
+            self.results = self.hands.process(img_rgb)
+            self._update_ewma(time.perf_counter() - start)
+
+    def _update_ewma(self, dt):
+        """Fold one inference duration into the running average"""
+        if self.infer_ewma:
+            self.infer_ewma = 0.9 * self.infer_ewma + 0.1 * dt
+        else:
+            self.infer_ewma = dt
+
     def find_hands(self, img, draw=True):
-        with self.lock:
-            try:
-                img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-                self.results = self.hands.process(img_rgb)
-                
-                if self.results.multi_hand_landmarks and draw:
-                    for hand_landmarks in self.results.multi_hand_landmarks:
-                        self.mp_draw.draw_landmarks(
-                            img, hand_landmarks, self.mp_hands.HAND_CONNECTIONS)
-                return img
-            except Exception as e:
-                print(f"Hand detection error: {e}")
-                return img
-
-    def find_position(self, img, hand_no=0):
-        lm_list = []
-        with self.lock:
-            if hasattr(self, 'results') and self.results.multi_hand_landmarks:
-                if hand_no < len(self.results.multi_hand_landmarks):
-                    my_hand = self.results.multi_hand_landmarks[hand_no]
-                    h, w, c = img.shape
-                    for id, lm in enumerate(my_hand.landmark):
-                        cx, cy = int(lm.x * w), int(lm.y * h)
-                        lm_list.append((id, cx, cy))
-        return lm_list
+        # No try/except here: a bad frame shape or dtype is a one-shot
+        # programming error, not a steady-state condition worth paying an
+        # exception-handler setup for on every frame
+        # Infer on a downscaled copy; landmarks are normalized so
+        # find_position still maps them to any caller frame
+        if (self.infer_size and
+                img.shape[1] > self.infer_size[0]):
+            if self._small_buf is None:
+                self._small_buf = np.empty(
+                    (self.infer_size[1], self.infer_size[0], 3),
+                    dtype=img.dtype)
+            small = cv2.resize(img, self.infer_size,
+                               dst=self._small_buf,
+                               interpolation=cv2.INTER_AREA)
+        else:
+            small = img
+        if (self._rgb_buf is None or
+                self._rgb_buf.shape != small.shape):
+            self._rgb_buf = np.empty_like(small)
+        img_rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB,
+                               dst=self._rgb_buf)
 
-    def is_palm_or_fist(self, lm_list, threshold=0.8):
-        if not lm_list or len(lm_list) < 21:
-            return None
+        if self._landmarker is not None:
+            # Async dispatch; the result lands in _on_result and
+            # find_position reads whatever is newest
+            self._timestamp_ms += 1
+            mp_image = mp.Image(
+                image_format=mp.ImageFormat.SRGB, data=img_rgb)
+            self._dispatch_t = time.perf_counter()
+            self._landmarker.detect_async(mp_image, self._timestamp_ms)
+            return img
 
+        # Hand the frame to the worker and return immediately;
+        # the copy detaches it from the reused dst buffer and is
+        # skipped entirely when the worker is still busy
         try:
-            tips = [lm_list[i] for i in [8, 12, 16, 20]]  # Index to pinky tips
-            mcp_joints = [lm_list[i] for i in [5, 9, 13, 17]]
+            self._in_q.put_nowait(img_rgb.copy())
+        except queue.Full:
+            pass
 
-            extended_fingers = 0
-            for tip, mcp in zip(tips, mcp_joints):
-                if tip[2] < mcp[2]:  # y-coord: lower on screen means finger is extended
-                    extended_fingers += 1
+        results = self.results
+        if results and results.multi_hand_landmarks and draw:
+            for hand_landmarks in results.multi_hand_landmarks:
+                self.mp_draw.draw_landmarks(
+                    img, hand_landmarks, self.mp_hands.HAND_CONNECTIONS)
+        return img
 
-            if extended_fingers >= 3:
-                return "Palm"
-            else:
-                return "Fist"
-        except Exception as e:
-            print(f"Gesture detection error: {e}")
+    def find_position(self, img, hand_no=0, out=None):
+        """Return landmarks as an (N, 3) int array of (id, x, y) rows
+
+        Pass a preallocated (21, 3) int32 array as `out` to fill it in
+        place and get a view back, avoiding a per-frame allocation.
+        """
+        # Producers publish whole immutable result objects by attribute
+        # assignment, which is atomic under the GIL; snapshotting into a
+        # local is all the synchronization a reader needs
+        landmarks = None
+        if self._landmarker is not None:
+            result = self._latest_result
+            if result and hand_no < len(result.hand_landmarks):
+                landmarks = result.hand_landmarks[hand_no]
+        else:
+            results = self.results
+            if results and results.multi_hand_landmarks:
+                if hand_no < len(results.multi_hand_landmarks):
+                    landmarks = results.multi_hand_landmarks[hand_no].landmark
+
+        if landmarks is None:
+            return np.empty((0, 3), dtype=np.int32)
+
+        h, w, c = img.shape
+        # fromiter fills a flat float32 buffer directly, skipping the
+        # 21 intermediate Python tuples a list comprehension would build
+        n = len(landmarks)
+        coords = np.fromiter(
+            (v for lm in landmarks for v in (lm.x, lm.y)),
+            dtype=np.float32, count=n * 2
+        ).reshape(n, 2)
+        if out is not None and len(out) >= n:
+            lm_arr = out[:n]
+        else:
+            lm_arr = np.empty((n, 3), dtype=np.int32)
+        lm_arr[:, 0] = np.arange(n)
+        lm_arr[:, 1] = (coords[:, 0] * w).astype(np.int32)
+        lm_arr[:, 2] = (coords[:, 1] * h).astype(np.int32)
+        return lm_arr
+
+    def is_palm_or_fist(self, lm_list, threshold=0.8):
+        if lm_list is None or len(lm_list) < 21:
             return None
 
+        pts = np.asarray(lm_list)
+        tips = pts[_TIP_IDX, 2]  # Index to pinky tip y-coords
+        mcps = pts[_MCP_IDX, 2]
+
+        # y-coord: lower on screen means finger is extended
+        extended_fingers = int(np.count_nonzero(tips < mcps))
+
+        return "Palm" if extended_fingers >= 3 else "Fist"
+
+    def tick(self, now=None):
+        """Refresh the per-frame timestamp; call once per main-loop pass"""
+        self._now = time.monotonic() if now is None else now
+        return self._now
+
+    def reset_gesture_state(self):
+        """Forget cached results and the in-progress gesture
+
+        Called when the application gates gestures off so a stale
+        detection can't re-fire once they are re-enabled.
+        """
+        self._latest_result = None
+        if self._landmarker is None:
+            self.results = None
+        self.current_gesture = None
+        self._stable_count = 0
+
     def detect_gesture(self, lm_list):
-        """Detect gesture with history tracking"""
-        current_time = time.time()
+        """Detect gesture with stability tracking"""
+        current_time = self._now
         gesture = self.is_palm_or_fist(lm_list)
-        
+
         if gesture:
             if gesture != self.current_gesture:
                 self.current_gesture = gesture
                 self.gesture_start_time = current_time
-                self.gesture_history.clear()
-            
-            self.gesture_history.append(gesture)
-            
+                self._stable_count = 1
+            else:
+                self._stable_count += 1
+
             # Check if gesture is held long enough and consistent
-            if (current_time - self.gesture_start_time >= self.gesture_hold_time and 
-                len(self.gesture_history) >= self.gesture_threshold and
-                all(g == gesture for g in self.gesture_history)):
+            if (current_time - self.gesture_start_time >= self.gesture_hold_time and
+                    self._stable_count >= self.gesture_threshold):
                 return gesture
-        
+
         return None
 
     def select_device(self, device):
         """Select a device for file transfer"""
         self.selected_device = device
-        self.device_selection_start = time.time()
+        self.device_selection_start = self._now
 
     def clear_selected_device(self):
         """Clear the selected device"""
         self.selected_device = None
         self.device_selection_start = 0
-        self.gesture_history.clear()
+        self._stable_count = 0
         self.current_gesture = None
 
     def is_device_selected(self):
         """Check if a device is currently selected and not timed out"""
         if not self.selected_device:
             return False
-        current_time = time.time()
-        return (current_time - self.device_selection_start) < self.device_selection_timeout
+        return (self._now - self.device_selection_start) < self.device_selection_timeout
 
     def get_selected_device(self):
         """Get the currently selected device"""